@@ -12,6 +12,7 @@ from app.nodes.pdf_generator import pdf_node
 from app.nodes.video_summary import video_summary_node
 from app.nodes.whatsapp_notifier import whatsapp_node
 from app.nodes.text_editor import text_editor_node
+from app.nodes.multi_llm import multi_llm_node
 
 node_registry = {
     "openai": openai_node,
@@ -27,5 +28,6 @@ node_registry = {
     "pdf": pdf_node,
     "whatsapp": whatsapp_node,
     "video_summary": video_summary_node,
-    "text_editor": text_editor_node
+    "text_editor": text_editor_node,
+    "multi_llm": multi_llm_node
 }
\ No newline at end of file
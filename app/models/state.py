@@ -8,6 +8,9 @@ class State(TypedDict):
     
     # Node-specific parameters (for Swagger testing)
     node_params: Optional[Dict[str, Dict[str, Any]]]  # New field for Swagger
+
+    # Per-provider results from the multi_llm fan-out node
+    provider_responses: Optional[Dict[str, Any]]
     
     # Legacy fields (deprecated but kept for compatibility)
     openai_api_key: Optional[str]
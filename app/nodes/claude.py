@@ -1,8 +1,12 @@
 import anthropic  
 from app.models.state import State  
 
-def claude_node(state: State) -> State:  
-    client = anthropic.Client(api_key=state["api_keys"]["anthropic"])  
+def claude_node(state: State, **params) -> State:  
+    client_kwargs = {"api_key": state["api_keys"]["anthropic"]}
+    if params.get("timeout"):
+        client_kwargs["timeout"] = params["timeout"]
+
+    client = anthropic.Client(**client_kwargs)
     
     response = client.messages.create(  
         model="claude-3-opus-20240229",  
@@ -1,13 +1,14 @@
 import google.generativeai as genai  
 from app.models.state import State  
 
-def gemini_node(state: State) -> State:  
+def gemini_node(state: State, **params) -> State:  
     genai.configure(api_key=state["api_keys"]["gemini"])  
     model = genai.GenerativeModel('gemini-2.5-flash')  
     
     response = model.generate_content(  
         state["user_query"],  
-        generation_config={"temperature": 0.7}  
+        generation_config={"temperature": 0.7},
+        request_options={"timeout": params["timeout"]} if params.get("timeout") else None
     )  
     
     state["current_output"] = response.text  
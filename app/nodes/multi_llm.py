@@ -0,0 +1,336 @@
+from app.models.state import State
+from app.nodes.openai import openai_node
+from app.nodes.claude import claude_node
+from app.nodes.gemini import gemini_node
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from collections import deque
+from typing import Optional, Dict, Any, List
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# provider name -> (node function, api_keys entry it reads)
+PROVIDERS = {
+    "openai": (openai_node, "openai"),
+    "claude": (claude_node, "anthropic"),
+    "gemini": (gemini_node, "gemini"),
+}
+
+SUPPORTED_MODES = ["first", "budget", "quorum", "all"]
+
+DEFAULT_TIMEOUT = 30
+HEDGE_FACTOR = 1.5
+STATS_WINDOW = 20      # most recent calls kept per provider
+STATS_TTL = 300        # seconds before a sample stops counting
+MAX_ERROR_RATE = 0.5   # providers failing more often than this are treated as unhealthy
+MIN_SAMPLES = 3        # calls needed before the error rate is trusted
+MAX_WORKERS = 32
+MIN_FALLBACK_SECONDS = 0.5  # don't start fallback calls with less time than this left
+
+# Shared across requests so a hanging provider can't pile up threads without bound
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="multi_llm")
+_inflight_lock = threading.Lock()
+_inflight = 0
+
+_stats_lock = threading.Lock()
+# provider -> deque of (finished_at, elapsed_seconds, ok)
+_samples: Dict[str, deque] = {}
+
+
+def _record(provider: str, elapsed: float, ok: bool, finished_at: Optional[float] = None) -> None:
+    if finished_at is None:
+        finished_at = time.monotonic()
+    with _stats_lock:
+        window = _samples.setdefault(provider, deque(maxlen=STATS_WINDOW))
+        window.append((finished_at, elapsed, ok))
+
+
+def _is_client_error(error: Exception) -> bool:
+    # Bad/missing keys and malformed requests belong to the caller, not the provider,
+    # so they must not mark a provider unhealthy for every other workflow.
+    # SDK errors expose the HTTP status as status_code (openai/anthropic) or code (google)
+    if isinstance(error, (KeyError, ValueError, TypeError)):
+        return True
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    return isinstance(status, int) and 400 <= status < 500 and status not in (408, 429)
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def get_provider_stats() -> Dict[str, Dict[str, Any]]:
+    """Returns p50/p95 latency (seconds), error rate and sample counts per provider,
+    over the last STATS_WINDOW calls no older than STATS_TTL seconds."""
+    cutoff = time.monotonic() - STATS_TTL
+    with _stats_lock:
+        snapshot = {
+            p: [s for s in window if s[0] >= cutoff] for p, window in _samples.items()
+        }
+
+    stats = {}
+    for provider, samples in snapshot.items():
+        if not samples:
+            continue
+        latencies = [elapsed for _, elapsed, ok in samples if ok]
+        failures = sum(1 for _, _, ok in samples if not ok)
+        stats[provider] = {
+            "samples": len(samples),
+            "failures": failures,
+            "error_rate": failures / len(samples),
+            "last_seen": max(finished for finished, _, _ in samples),
+            "p50": _percentile(latencies, 0.5) if latencies else None,
+            "p95": _percentile(latencies, 0.95) if latencies else None,
+        }
+    return stats
+
+
+def _is_healthy(provider_stats: Optional[Dict[str, Any]]) -> bool:
+    if not provider_stats or provider_stats["samples"] < MIN_SAMPLES:
+        return True
+    return provider_stats["error_rate"] <= MAX_ERROR_RATE
+
+
+def _adaptive_budget(providers: List[str], stats: Dict[str, Dict[str, Any]], timeout: float) -> float:
+    # Hedge around the second-best p95 so the budget always admits at least two
+    # providers; keying it on the single fastest one would starve everyone else
+    p95s = sorted(
+        stats[p]["p95"] for p in providers
+        if p in stats and stats[p]["p95"] is not None and _is_healthy(stats[p])
+    )
+    if len(p95s) < 2:
+        return timeout
+    return min(timeout, p95s[1] * HEDGE_FACTOR)
+
+
+def _select_within_budget(
+    providers: List[str], stats: Dict[str, Dict[str, Any]], budget: float
+) -> List[str]:
+    selected = []
+    excluded = []
+    for p in providers:
+        provider_stats = stats.get(p)
+        p95 = provider_stats["p95"] if provider_stats else None
+        if _is_healthy(provider_stats) and (p95 is None or p95 <= budget):
+            selected.append(p)
+        else:
+            excluded.append(p)
+
+    # Keep probing one excluded provider (the one we've heard from least recently)
+    # so a provider that got faster or recovered can earn its way back in
+    if excluded:
+        probe = min(excluded, key=lambda p: stats[p]["last_seen"] if p in stats else 0)
+        selected.append(probe)
+    return selected
+
+
+def _fastest(providers: List[str], stats: Dict[str, Dict[str, Any]]) -> List[str]:
+    def key(p):
+        p50 = stats[p]["p50"] if p in stats else None
+        return (p50 is None, p50 or 0)
+    return sorted(providers, key=key)
+
+
+def _parse_providers(value: Any) -> List[str]:
+    if isinstance(value, str):
+        value = [p.strip() for p in value.split(",") if p.strip()]
+    elif not isinstance(value, (list, tuple)):
+        raise ValueError(
+            f"providers must be a list or a comma-separated string, got {type(value).__name__}"
+        )
+    for provider in value:
+        if not isinstance(provider, str):
+            raise ValueError(f"providers entries must be strings, got {provider!r}")
+    # Same provider twice would mean two billed calls writing to one result slot
+    return list(dict.fromkeys(value))
+
+
+def _positive_number(params: Dict[str, Any], name: str, default: Any) -> Any:
+    value = params.get(name)
+    if value is None:
+        return default
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+        raise ValueError(f"{name} must be a positive number, got {value!r}")
+    return value
+
+
+def _free_workers() -> int:
+    with _inflight_lock:
+        return MAX_WORKERS - _inflight
+
+
+def _release(_future) -> None:
+    global _inflight
+    with _inflight_lock:
+        _inflight -= 1
+
+
+def _call_provider(provider: str, state: State, deadline: float) -> str:
+    node_func, _ = PROVIDERS[provider]
+    started = time.monotonic()
+    remaining = deadline - started
+    if remaining <= 0:
+        # Sat in the executor queue past the caller's deadline; nobody is waiting anymore
+        raise TimeoutError("deadline passed while queued")
+    try:
+        result = node_func(dict(state), timeout=remaining)
+    except Exception as e:
+        if not _is_client_error(e):
+            _record(provider, time.monotonic() - started, ok=False)
+        raise
+    _record(provider, time.monotonic() - started, ok=True)
+    return result["current_output"]
+
+
+def _submit(provider: str, state: State, deadline: float):
+    global _inflight
+    with _inflight_lock:
+        _inflight += 1
+    future = _executor.submit(_call_provider, provider, state, deadline)
+    future.add_done_callback(_release)
+    return future
+
+
+def multi_llm_node(state: State, **params) -> State:
+    """
+    Sends the same prompt to several LLM providers concurrently.
+
+    Modes:
+    - first: first successful response wins
+    - budget: like first, but only races providers whose recent p95 latency fits
+      budget_seconds (plus one excluded provider as a probe); if none answer in
+      budget, the remaining providers are tried until timeout
+    - quorum: waits for `quorum` successful responses (default: majority)
+    - all: waits for every provider (bounded by timeout)
+
+    Losing calls can't be interrupted once started; they are left to finish in
+    the background (reported as "abandoned") and still feed the latency stats.
+
+    Calls share one executor of MAX_WORKERS threads. When it has fewer free
+    workers than providers to race, first/budget stop hedging and only call the
+    providers with the best recent p50 (reported as "saturated"). Calls that
+    wait in the queue past the deadline are dropped without being sent.
+    """
+    mode = params.get("mode", "first")
+    if mode not in SUPPORTED_MODES:
+        raise ValueError(f"Unsupported mode: {mode}. Use one of {SUPPORTED_MODES}")
+
+    api_keys = state.get("api_keys") or {}
+    if params.get("providers") is not None:
+        providers = _parse_providers(params["providers"])
+    else:
+        providers = [name for name, (_, key) in PROVIDERS.items() if api_keys.get(key)]
+    for provider in providers:
+        if provider not in PROVIDERS:
+            raise ValueError(f"Unsupported provider: {provider}")
+        if not api_keys.get(PROVIDERS[provider][1]):
+            raise ValueError(f"API key for provider {provider} missing")
+    if not providers:
+        raise ValueError("No LLM providers configured for multi_llm node")
+
+    timeout = _positive_number(params, "timeout", DEFAULT_TIMEOUT)
+    stats = get_provider_stats()
+    budget = _positive_number(params, "budget_seconds", None)
+    if budget is None:
+        budget = _adaptive_budget(providers, stats, timeout)
+
+    if mode == "quorum":
+        required = params.get("quorum", len(providers) // 2 + 1)
+        if isinstance(required, bool) or not isinstance(required, int) \
+                or not 1 <= required <= len(providers):
+            raise ValueError(
+                f"quorum must be an integer between 1 and {len(providers)}, got {required!r}"
+            )
+    elif mode == "all":
+        required = len(providers)
+    else:
+        required = 1
+
+    prompt_state = dict(state)
+    if params.get("user_prompt"):
+        prompt_state["user_query"] = params["user_prompt"]
+
+    if mode == "budget":
+        racing = _select_within_budget(providers, stats, budget)
+        reserve = [p for p in providers if p not in racing]
+    else:
+        racing = providers
+        reserve = []
+
+    saturated = False
+    free = _free_workers()
+    if mode in ("first", "budget") and free < len(racing):
+        # A hedge that queues behind abandoned calls only adds latency
+        saturated = True
+        racing = _fastest(racing, stats)[:max(1, free)]
+
+    started = time.monotonic()
+    deadline = started + timeout
+    pending = {_submit(provider, prompt_state, deadline): provider for provider in racing}
+    responses: Dict[str, str] = {}
+    errors: Dict[str, str] = {}
+    fallback = False
+
+    def collect(until: float) -> None:
+        while pending and len(responses) < required:
+            remaining = until - time.monotonic()
+            if remaining <= 0:
+                return
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    responses[provider] = future.result()
+                except Exception as e:
+                    logger.warning(f"multi_llm provider {provider} failed: {str(e)}")
+                    errors[provider] = str(e)
+
+    if mode == "budget":
+        collect(min(deadline, started + budget))
+        if not responses and deadline - time.monotonic() >= MIN_FALLBACK_SECONDS:
+            # Nothing inside the budget: bring in the rest and keep going until timeout
+            fallback = True
+            if saturated:
+                reserve = _fastest(reserve, stats)[:max(0, _free_workers())]
+            for provider in reserve:
+                pending[_submit(provider, prompt_state, deadline)] = provider
+            collect(deadline)
+    else:
+        collect(deadline)
+
+    for future, provider in pending.items():
+        if future.cancel():
+            errors[provider] = "cancelled"
+        elif len(responses) >= required:
+            errors[provider] = "abandoned"
+        else:
+            errors[provider] = "timed out"
+
+    if len(responses) < required and mode != "all":
+        raise RuntimeError(
+            f"multi_llm got {len(responses)}/{required} responses in {mode} mode: {errors}"
+        )
+    if not responses:
+        raise RuntimeError(f"All LLM providers failed: {errors}")
+
+    if mode in ("first", "budget"):
+        winner = next(iter(responses))
+        state["current_output"] = responses[winner]
+    else:
+        winner = None
+        state["current_output"] = responses
+
+    state["provider_responses"] = {
+        "mode": mode,
+        "winner": winner,
+        "responses": responses,
+        "errors": errors,
+        "budget_seconds": budget,
+        "fallback": fallback,
+        "saturated": saturated,
+    }
+    return state
@@ -1,14 +1,18 @@
 from openai import OpenAI
 from app.models.state import State
 
-def openai_node(state: State) -> State:
+def openai_node(state: State, **params) -> State:
    
     api_key = state["api_keys"].get("openai") or state.get("openai_api_key")
     
     if not api_key:
         raise ValueError("OpenAI API key missing")
 
-    client = OpenAI(api_key=api_key)
+    client_kwargs = {"api_key": api_key}
+    if params.get("timeout"):
+        client_kwargs["timeout"] = params["timeout"]
+
+    client = OpenAI(**client_kwargs)
     response = client.chat.completions.create(
         model="gpt-4.1-mini",   
         messages=[{"role": "user", "content": state["user_query"]}]
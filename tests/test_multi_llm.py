@@ -0,0 +1,256 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.nodes import multi_llm
+
+
+class AuthError(Exception):
+    status_code = 401
+
+
+def make_provider(delay, error=None, calls=None, name=None):
+    def node(state, **params):
+        if calls is not None:
+            calls.append(name)
+        time.sleep(delay)
+        if error is not None:
+            raise error
+        state["current_output"] = f"{name or 'reply'} after {delay}"
+        return state
+    return node
+
+
+@pytest.fixture(autouse=True)
+def executor(monkeypatch):
+    # A private pool per test, drained on teardown, so calls abandoned by one
+    # test can't write stats into the next
+    pool = ThreadPoolExecutor(max_workers=multi_llm.MAX_WORKERS)
+    monkeypatch.setattr(multi_llm, "_executor", pool)
+    multi_llm._samples.clear()
+    yield pool
+    pool.shutdown(wait=True)
+    multi_llm._samples.clear()
+
+
+@pytest.fixture
+def providers(monkeypatch):
+    def install(**specs):
+        table = {name: (node, name) for name, node in specs.items()}
+        monkeypatch.setattr(multi_llm, "PROVIDERS", table)
+    return install
+
+
+def base_state(*keys):
+    return {"user_query": "hi", "current_output": None, "api_keys": {k: "key" for k in keys}}
+
+
+def test_first_mode_returns_fastest_and_abandons_the_rest(providers):
+    providers(slow=make_provider(0.3, name="slow"), fast=make_provider(0.01, name="fast"))
+
+    state = multi_llm.multi_llm_node(base_state("slow", "fast"))
+
+    assert state["current_output"] == "fast after 0.01"
+    assert state["provider_responses"]["winner"] == "fast"
+    assert state["provider_responses"]["errors"] == {"slow": "abandoned"}
+
+
+def test_abandoned_calls_still_record_latency(providers, executor):
+    providers(slow=make_provider(0.1), fast=make_provider(0.01))
+
+    multi_llm.multi_llm_node(base_state("slow", "fast"))
+    executor.shutdown(wait=True)
+
+    assert multi_llm.get_provider_stats()["slow"]["p95"] >= 0.1
+
+
+def test_first_mode_skips_failures(providers):
+    providers(
+        bad=make_provider(0.01, error=RuntimeError("boom")),
+        good=make_provider(0.05, name="good"),
+    )
+
+    state = multi_llm.multi_llm_node(base_state("bad", "good"))
+
+    assert state["current_output"] == "good after 0.05"
+    assert state["provider_responses"]["errors"] == {"bad": "boom"}
+
+
+def test_quorum_and_all_return_partial_results(providers):
+    providers(
+        a=make_provider(0.01, name="a"),
+        b=make_provider(0.02, name="b"),
+        c=make_provider(0.01, error=RuntimeError("boom")),
+    )
+
+    quorum = multi_llm.multi_llm_node(base_state("a", "b", "c"), mode="quorum")
+    assert set(quorum["current_output"]) == {"a", "b"}
+
+    everything = multi_llm.multi_llm_node(base_state("a", "b", "c"), mode="all")
+    assert set(everything["current_output"]) == {"a", "b"}
+    assert everything["provider_responses"]["errors"] == {"c": "boom"}
+
+    with pytest.raises(RuntimeError):
+        multi_llm.multi_llm_node(base_state("a", "b", "c"), mode="quorum", quorum=3)
+
+
+def test_timeout_raises_when_nobody_answers(providers):
+    providers(slow=make_provider(0.3))
+
+    with pytest.raises(RuntimeError, match="timed out"):
+        multi_llm.multi_llm_node(base_state("slow"), timeout=0.05)
+
+
+def test_budget_mode_filters_slow_and_unhealthy_providers(providers):
+    calls = []
+    providers(
+        fast=make_provider(0.01, calls=calls, name="fast"),
+        steady=make_provider(0.02, calls=calls, name="steady"),
+        slow=make_provider(0.2, calls=calls, name="slow"),
+        flaky=make_provider(0.01, error=RuntimeError("boom"), calls=calls, name="flaky"),
+    )
+    now = time.monotonic()
+    for _ in range(multi_llm.MIN_SAMPLES):
+        multi_llm._record("fast", 0.01, True, finished_at=now)
+        multi_llm._record("steady", 0.02, True, finished_at=now)
+        multi_llm._record("flaky", 0.01, False, finished_at=now)
+        # Stalest of the excluded providers, so it's the one picked as a probe
+        multi_llm._record("slow", 0.2, True, finished_at=now - 10)
+
+    state = multi_llm.multi_llm_node(
+        base_state("fast", "steady", "slow", "flaky"), mode="budget"
+    )
+
+    # Default budget is keyed on the second-best p95, so both healthy fast ones race
+    assert state["provider_responses"]["budget_seconds"] == pytest.approx(0.03)
+    assert state["current_output"] == "fast after 0.01"
+    assert sorted(calls) == ["fast", "slow", "steady"]
+
+
+def test_budget_mode_reprobes_providers_that_got_faster(providers):
+    # claude warmed up slow, then recovered; gemini degraded
+    calls = []
+    providers(
+        claude=make_provider(0.001, calls=calls, name="claude"),
+        gemini=make_provider(0.2, calls=calls, name="gemini"),
+        openai=make_provider(0.05, calls=calls, name="openai"),
+    )
+    for _ in range(10):
+        multi_llm._record("claude", 0.3, True)
+        multi_llm._record("gemini", 0.01, True)
+        multi_llm._record("openai", 0.05, True)
+
+    state = base_state("claude", "gemini", "openai")
+    winners = [
+        multi_llm.multi_llm_node(dict(state), mode="budget")["provider_responses"]["winner"]
+        for _ in range(5)
+    ]
+
+    assert calls.count("claude") == 5
+    assert winners == ["claude"] * 5
+
+
+def test_budget_mode_falls_back_when_nothing_answers_in_budget(providers):
+    providers(only=make_provider(0.1, name="only"))
+
+    state = multi_llm.multi_llm_node(base_state("only"), mode="budget", budget_seconds=0.02)
+
+    assert state["current_output"] == "only after 0.1"
+    assert state["provider_responses"]["fallback"] is True
+
+
+def test_budget_mode_does_not_fall_back_past_the_deadline(providers):
+    calls = []
+    providers(
+        slow=make_provider(0.3, calls=calls, name="slow"),
+        flaky_a=make_provider(0.01, error=RuntimeError("boom"), calls=calls, name="flaky_a"),
+        flaky_b=make_provider(0.01, error=RuntimeError("boom"), calls=calls, name="flaky_b"),
+    )
+    now = time.monotonic()
+    for _ in range(multi_llm.MIN_SAMPLES):
+        multi_llm._record("flaky_a", 0.01, False, finished_at=now - 10)
+        multi_llm._record("flaky_b", 0.01, False, finished_at=now)
+
+    with pytest.raises(RuntimeError):
+        multi_llm.multi_llm_node(
+            base_state("slow", "flaky_a", "flaky_b"), mode="budget", timeout=0.1
+        )
+
+    # flaky_a went out as the probe; flaky_b was held in reserve and never sent
+    assert "flaky_b" not in calls
+
+
+def test_saturated_executor_stops_hedging(providers, monkeypatch):
+    monkeypatch.setattr(multi_llm, "MAX_WORKERS", 2)
+    calls = []
+    providers(
+        hang=make_provider(0.3, calls=calls, name="hang"),
+        fast=make_provider(0.01, calls=calls, name="fast"),
+        other=make_provider(0.02, calls=calls, name="other"),
+    )
+    multi_llm._record("fast", 0.01, True)
+    multi_llm._record("other", 0.02, True)
+
+    # Leaves "hang" holding one of the two workers
+    multi_llm.multi_llm_node(base_state("hang", "fast"), providers="hang,fast")
+    calls.clear()
+
+    state = multi_llm.multi_llm_node(base_state("hang", "fast", "other"))
+
+    assert state["provider_responses"]["saturated"] is True
+    assert calls == ["fast"]
+
+
+def test_client_errors_do_not_count_against_provider_health(providers):
+    providers(
+        openai=make_provider(0.01, error=AuthError("bad key")),
+        gemini=make_provider(0.01, name="gemini"),
+    )
+
+    for _ in range(multi_llm.MIN_SAMPLES):
+        multi_llm.multi_llm_node(base_state("openai", "gemini"), mode="all")
+
+    assert "openai" not in multi_llm.get_provider_stats()
+
+
+def test_stale_samples_expire():
+    multi_llm._record("old", 0.5, False, finished_at=time.monotonic() - multi_llm.STATS_TTL - 1)
+
+    assert "old" not in multi_llm.get_provider_stats()
+
+
+@pytest.mark.parametrize("params, message", [
+    ({"providers": 5}, "providers must be"),
+    ({"providers": ["openai", 5]}, "providers entries must be strings"),
+    ({"providers": "openai,nope"}, "Unsupported provider: nope"),
+    ({"providers": "openai,gemini"}, "API key for provider gemini missing"),
+    ({"budget_seconds": 0}, "budget_seconds must be a positive number"),
+    ({"timeout": -1}, "timeout must be a positive number"),
+    ({"mode": "quorum", "quorum": 4}, "quorum must be an integer"),
+])
+def test_invalid_params_are_rejected(providers, params, message):
+    providers(openai=make_provider(0.01), gemini=make_provider(0.01))
+
+    with pytest.raises(ValueError, match=message):
+        multi_llm.multi_llm_node(base_state("openai"), **params)
+
+
+def test_providers_accepts_comma_separated_string(providers):
+    providers(openai=make_provider(0.01, name="openai"), gemini=make_provider(0.01, name="gemini"))
+
+    state = multi_llm.multi_llm_node(base_state("openai", "gemini"), providers="openai")
+
+    assert state["current_output"] == "openai after 0.01"
+
+
+def test_duplicate_providers_are_called_once(providers):
+    calls = []
+    providers(openai=make_provider(0.01, calls=calls, name="openai"))
+
+    state = multi_llm.multi_llm_node(
+        base_state("openai"), providers="openai,openai", mode="quorum"
+    )
+
+    assert calls == ["openai"]
+    assert state["current_output"] == {"openai": "openai after 0.01"}